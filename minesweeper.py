@@ -1,308 +1,453 @@
-import itertools
-import random
-import copy
-
-
-class Minesweeper:
-    """
-    Minesweeper game representation
-    """
-
-    def __init__(self, height=8, width=8, mines=8):
-
-        # Set initial width, height, and number of mines
-        self.height = height
-        self.width = width
-        self.mines = set()
-
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
-
-        # At first, player has found no mines
-        self.mines_found = set()
-
-    def print(self):
-        """
-        Prints a text-based representation
-        of where mines are located.
-        """
-        for i in range(self.height):
-            print("--" * self.width + "-")
-            for j in range(self.width):
-                if self.board[i][j]:
-                    print("|X", end="")
-                else:
-                    print("| ", end="")
-            print("|")
-        print("--" * self.width + "-")
-
-    def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
-
-    def nearby_mines(self, cell):
-        """
-        Returns the number of mines that are
-        within one row and column of a given cell,
-        not including the cell itself.
-        """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
-
-    def won(self):
-        """
-        Checks if all mines have been flagged.
-        """
-        return self.mines_found == self.mines
-
-
-class Sentence:
-    """
-    Logical statement about a Minesweeper game
-    A sentence consists of a set of board cells,
-    and a count of the number of those cells which are mines.
-    """
-
-    def __init__(self, cells, count):
-        self.cells = set(cells)
-        self.count = count
-
-    def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
-
-    def __str__(self):
-        return f"{self.cells} = {self.count}"
-
-    def is_empty(self):
-        return len(self.cells) == 0
-
-    def known_mines(self):
-        """
-        Returns the set of all cells in self.cells known to be mines.
-        """
-        if self.count == len(self.cells):
-            return self.cells
-        else:
-            return None
-
-    def known_safes(self):
-        """
-        Returns the set of all cells in self.cells known to be safe.
-        """
-        if self.count == 0:
-            return self.cells
-        else:
-            return None
-
-    def mark_mine(self, cell):
-        """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be a mine.
-        """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -= 1
-            return True
-        else:
-            return False
-
-    def mark_safe(self, cell):
-        """
-        Updates internal knowledge representation given the fact that
-        a cell is known to be safe.
-        """
-        if cell in self.cells:
-            self.cells.remove(cell)
-            return True
-        else:
-            return False
-
-
-class MinesweeperAI:
-    """
-    Minesweeper game player
-    """
-
-    def __init__(self, height=8, width=8):
-
-        # Set initial height and width
-        self.height = height
-        self.width = width
-
-        # Keep track of which cells have been clicked on
-        self.moves_made = set()
-
-        # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
-
-        # List of sentences about the game known to be true
-        self.knowledge = []
-
-    def mark_mine(self, cell):
-        """
-        Marks a cell as a mine, and updates all knowledge
-        to mark that cell as a mine as well.
-        """
-        self.mines.add(cell)
-        for sentence in self.knowledge:
-            # if a sentence is altered
-            if sentence.mark_mine(cell):
-                # remove sentence from knowledge and conclude_infer_integrate it
-                self.knowledge.remove(sentence)
-                self.conclude_infer_integrate(sentence)
-
-    def mark_safe(self, cell):
-        """
-        Marks a cell as safe, and updates all knowledge
-        to mark that cell as safe as well.
-        """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            # if a sentence is altered
-            if sentence.mark_safe(cell):
-                # remove sentence from knowledge and conclude_infer_integrate it
-                self.knowledge.remove(sentence)
-                self.conclude_infer_integrate(sentence)
-
-    def add_knowledge(self, cell, count):
-        """
-        Called when the Minesweeper board tells us, for a given
-        safe cell, how many neighboring cells have mines in them.
-
-        This function should:
-            1) mark the cell as a move that has been made
-            2) mark the cell as safe
-            3) add a new sentence to the AI's knowledge base
-               based on the value of `cell` and `count`
-            4) mark any additional cells as safe or as mines
-               if it can be concluded based on the AI's knowledge base
-            5) add any new sentences to the AI's knowledge base
-               if they can be inferred from existing knowledge
-        """
-        # record as move made
-        self.moves_made.add(cell)
-        # record as safe
-        self.mark_safe(cell)
-        # create new knowledge of surrounding cells
-        surrounding_unknowns = set()
-        for i in range(cell[0] - 1, cell[0] + 2):
-            if 0 <= i < self.height:
-                for j in range(cell[1] - 1, cell[1] + 2):
-                    if 0 <= j < self.width:
-                        # ignore known safes, which includes current cell:
-                        if (i, j) not in self.safes:
-                            # lower count and ignore cell for known mine cell:
-                            if (i, j) in self.mines:
-                                count -= 1
-                            else:
-                                surrounding_unknowns.add((i, j))
-        # conclude, infer, integrate new knowledge
-        self.conclude_infer_integrate(Sentence(surrounding_unknowns, count))
-
-    # check a sentence for safes or mines, if so, execute conclusions
-    def is_conclusive(self, sentence):
-        safes = copy.deepcopy(sentence.known_safes())
-        if safes:
-            for cell in safes:
-                self.mark_safe(cell)
-            return True
-        else:
-            mines = copy.deepcopy(sentence.known_mines())
-            if mines:
-                for cell in mines:
-                    self.mark_mine(cell)
-                return True
-        # if inconclusive, return false
-        return False
-
-    # conclude sentances that are conclusive, draw inferences, add to knowlege
-    def conclude_infer_integrate(self, sentence):
-        # filter empty sentences and sentences that have already been through conclude_infer_integrate
-        if sentence in self.knowledge or sentence.is_empty():
-            return
-        # if sentence is conclusive, execute conclusions; otherwise...
-        if not self.is_conclusive(sentence):
-            # prepare to build inferences
-            inferences = []
-            # compare sentence to all other sentences in knowledge
-            for other_sentence in self.knowledge:
-                # check for and make inferences
-                if sentence.cells.issubset(other_sentence.cells):
-                    inference = Sentence(
-                        other_sentence.cells - sentence.cells,
-                        other_sentence.count - sentence.count,
-                    )
-                elif other_sentence.cells.issubset(sentence.cells):
-                    inference = Sentence(
-                        sentence.cells - other_sentence.cells,
-                        sentence.count - other_sentence.count,
-                    )
-                # try another sentence if no inferences have been made
-                else:
-                    continue
-                # add inference if it is new
-                if inference not in inferences and inference not in self.knowledge:
-                    inferences.append(inference)
-            # add sentence to knowledge
-            self.knowledge.append(sentence)
-            # if inferences were made, conclude_infer_integrate them
-            if inferences:
-                # integrate inferences into KB
-                for inference in inferences:
-                    self.conclude_infer_integrate(inference)
-
-    def make_safe_move(self):
-        """
-        Returns a safe cell to choose on the Minesweeper board.
-        The move must be known to be safe, and not already a move
-        that has been made.
-        This function may use the knowledge in self.mines, self.safes
-        and self.moves_made, but should not modify any of those values.
-        """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
-        return None
-
-    def make_random_move(self):
-        """
-        Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
-            1) have not already been chosen, and
-            2) are not known to be mines
-        """
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                    return (i, j)
-        return None
+import collections
+import itertools
+import random
+
+
+class Minesweeper:
+    """
+    Minesweeper game representation
+    """
+
+    def __init__(self, height=8, width=8, mines=8):
+
+        # Set initial width and height
+        self.height = height
+        self.width = width
+
+        # Add mines randomly: one unbiased sample of cell indexes,
+        # with no rejection loop even on mine-dense boards. The board
+        # is an integer bitboard where bit i * width + j stands for
+        # cell (i, j)
+        indexes = random.sample(range(height * width), mines)
+        self.mines = {divmod(k, width) for k in indexes}
+        self.board = sum(1 << k for k in indexes)
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            for j in range(self.width):
+                if self.board & (1 << (i * self.width + j)):
+                    print("|X", end="")
+                else:
+                    print("| ", end="")
+            print("|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board & (1 << (i * self.width + j)))
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+
+        # Build the bitmask of the in-bounds 3x3 window around the
+        # cell in a single comprehension; the min/max bounds replace
+        # per-cell bounds checks
+        window = sum(
+            1 << (i * self.width + j)
+            for i in range(max(0, cell[0] - 1), min(self.height, cell[0] + 2))
+            for j in range(max(0, cell[1] - 1), min(self.width, cell[1] + 2))
+        )
+
+        # Ignore the cell itself
+        window ^= 1 << (cell[0] * self.width + cell[1])
+
+        # Count mines in the window with a single popcount
+        return (self.board & window).bit_count()
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return self.mines_found == self.mines
+
+
+def find_inferences(new_cells, new_count, kb_cells, kb_counts):
+    """
+    Inference kernel of conclude_infer_integrate: compares a new
+    sentence against the knowledge base packed as parallel lists of
+    cell bitmasks and counts, and returns the (cells, count) pair of
+    every inference the subset rule yields.
+
+    Pure integer arithmetic over flat lists, so it compiles directly
+    under a JIT such as numba should one ever be added.
+    """
+    out = []
+    for i in range(len(kb_cells)):
+        other = kb_cells[i]
+        overlap = new_cells & other
+        if overlap == new_cells:
+            out.append((other & ~new_cells, kb_counts[i] - new_count))
+        elif overlap == other:
+            out.append((new_cells & ~other, new_count - kb_counts[i]))
+    return out
+
+
+def mask_cells(mask, width):
+    """
+    Yields the (i, j) cells encoded in an integer cell bitmask.
+    """
+    while mask:
+        bit = mask & -mask
+        yield divmod(bit.bit_length() - 1, width)
+        mask ^= bit
+
+
+class Sentence:
+    """
+    Logical statement about a Minesweeper game
+    A sentence consists of a set of board cells, encoded as an integer
+    bitmask where bit i * width + j stands for cell (i, j), and a count
+    of the number of those cells which are mines.
+    """
+
+    # fixed attribute layout: no per-instance __dict__, and attribute
+    # access on the inference hot paths skips the dict machinery
+    __slots__ = ("cells", "count", "width", "hash")
+
+    def __init__(self, cells, count, width):
+        self.cells = cells
+        self.count = count
+        self.width = width
+        # cache the hash: sentences are probed against the knowledge
+        # dict and cell index far more often than they are mutated
+        self.hash = hash((cells, count))
+
+    def __eq__(self, other):
+        return self.cells == other.cells and self.count == other.count
+
+    def __hash__(self):
+        return self.hash
+
+    def __str__(self):
+        return f"{set(mask_cells(self.cells, self.width))} = {self.count}"
+
+    def is_empty(self):
+        return self.cells == 0
+
+    def known_mines(self):
+        """
+        Returns the bitmask of all cells in self.cells known to be
+        mines, or 0 if the sentence is not conclusive.
+        """
+        if self.count == self.cells.bit_count():
+            return self.cells
+        else:
+            return 0
+
+    def known_safes(self):
+        """
+        Returns the bitmask of all cells in self.cells known to be
+        safe, or 0 if the sentence is not conclusive.
+        """
+        if self.count == 0:
+            return self.cells
+        else:
+            return 0
+
+    def mark_mines(self, mask):
+        """
+        Updates internal knowledge representation given the fact that
+        every cell in a bitmask is known to be a mine.
+        """
+        hit = self.cells & mask
+        if hit:
+            self.cells ^= hit
+            self.count -= hit.bit_count()
+            self.hash = hash((self.cells, self.count))
+            return True
+        else:
+            return False
+
+    def mark_safes(self, mask):
+        """
+        Updates internal knowledge representation given the fact that
+        every cell in a bitmask is known to be safe.
+        """
+        hit = self.cells & mask
+        if hit:
+            self.cells ^= hit
+            self.hash = hash((self.cells, self.count))
+            return True
+        else:
+            return False
+
+
+class MinesweeperAI:
+    """
+    Minesweeper game player
+    """
+
+    def __init__(self, height=8, width=8):
+
+        # Set initial height and width
+        self.height = height
+        self.width = width
+
+        # Keep track of which cells have been clicked on
+        self.moves_made = set()
+
+        # Keep track of cells known to be safe or mines
+        self.mines = set()
+        self.safes = set()
+
+        # Bitmask mirrors of moves_made, mines, and safes (bit
+        # i * width + j), so add_knowledge can run on whole-board
+        # bitwise ops instead of per-cell set lookups
+        self.moves_mask = 0
+        self.mines_mask = 0
+        self.safes_mask = 0
+
+        # Bitmask covering every cell on the board
+        self.all_mask = (1 << (height * width)) - 1
+
+        # Precompute each cell's bit so hot paths reuse the same
+        # word-sized int objects instead of recomputing the shift;
+        # on the default 8x8 board every mask stays a single machine
+        # word inside CPython's int representation
+        self.cell_bit = {
+            (i, j): 1 << (i * width + j)
+            for i in range(height)
+            for j in range(width)
+        }
+
+        # Sentences about the game known to be true, kept as an
+        # insertion-ordered dict for O(1) membership and removal
+        self.knowledge = {}
+
+        # Knowledge packed as persistent parallel lists of masks and
+        # counts for the inference kernel, with each sentence's slot
+        # tracked so removal is an O(1) swap with the last slot
+        self.kb_sentences = []
+        self.kb_cells = []
+        self.kb_counts = []
+        self.kb_slot = {}
+
+        # Inverted index mapping each cell to the sentences that
+        # reference it, so marks only touch relevant sentences
+        self.cell_index = collections.defaultdict(set)
+
+        # Worklist of sentences awaiting integration, drained
+        # iteratively by conclude_infer_integrate; the flag marks a
+        # drain already running higher up the stack
+        self.work = collections.deque()
+        self.integrating = False
+
+        # Precompute the in-bounds neighborhood of every cell as a
+        # bitmask once, since the board dimensions never change
+        self.neighbor_mask = {
+            (i, j): sum(
+                1 << ((i + di) * width + (j + dj))
+                for di in (-1, 0, 1)
+                for dj in (-1, 0, 1)
+                if (di or dj) and 0 <= i + di < height and 0 <= j + dj < width
+            )
+            for i in range(height)
+            for j in range(width)
+        }
+
+    # add a sentence to knowledge, the packed arrays, and the cell index
+    def add_to_knowledge(self, sentence):
+        self.knowledge[sentence] = None
+        self.kb_slot[sentence] = len(self.kb_sentences)
+        self.kb_sentences.append(sentence)
+        self.kb_cells.append(sentence.cells)
+        self.kb_counts.append(sentence.count)
+        for cell in mask_cells(sentence.cells, self.width):
+            self.cell_index[cell].add(sentence)
+
+    # remove a sentence from knowledge, the packed arrays, and the cell index
+    def remove_from_knowledge(self, sentence):
+        del self.knowledge[sentence]
+        # swap the last packed slot into the vacated one
+        slot = self.kb_slot.pop(sentence)
+        last = len(self.kb_sentences) - 1
+        if slot != last:
+            moved = self.kb_sentences[last]
+            self.kb_sentences[slot] = moved
+            self.kb_cells[slot] = self.kb_cells[last]
+            self.kb_counts[slot] = self.kb_counts[last]
+            self.kb_slot[moved] = slot
+        self.kb_sentences.pop()
+        self.kb_cells.pop()
+        self.kb_counts.pop()
+        for cell in mask_cells(sentence.cells, self.width):
+            self.cell_index[cell].discard(sentence)
+
+    def mark_mine(self, cell):
+        """
+        Marks a cell as a mine, and updates all knowledge
+        to mark that cell as a mine as well.
+        """
+        self.mark_mines(self.cell_bit[cell])
+
+    def mark_mines(self, mask):
+        """
+        Marks every cell in a bitmask as a mine, and updates all
+        knowledge in a single pass.
+        """
+        self.mines.update(mask_cells(mask, self.width))
+        self.mines_mask |= mask
+        # only sentences referencing one of the cells can be altered;
+        # gather them through the cell index once
+        touched = set()
+        for cell in mask_cells(mask, self.width):
+            touched |= self.cell_index.get(cell, set())
+        for sentence in touched:
+            # if integration hasn't already removed the sentence,
+            # remove it from knowledge before mutating it, since
+            # mutation changes its hash
+            if sentence in self.knowledge:
+                self.remove_from_knowledge(sentence)
+                sentence.mark_mines(mask)
+                self.conclude_infer_integrate(sentence)
+
+    def mark_safe(self, cell):
+        """
+        Marks a cell as safe, and updates all knowledge
+        to mark that cell as safe as well.
+        """
+        self.mark_safes(self.cell_bit[cell])
+
+    def mark_safes(self, mask):
+        """
+        Marks every cell in a bitmask as safe, and updates all
+        knowledge in a single pass.
+        """
+        self.safes.update(mask_cells(mask, self.width))
+        self.safes_mask |= mask
+        # only sentences referencing one of the cells can be altered;
+        # gather them through the cell index once
+        touched = set()
+        for cell in mask_cells(mask, self.width):
+            touched |= self.cell_index.get(cell, set())
+        for sentence in touched:
+            # if integration hasn't already removed the sentence,
+            # remove it from knowledge before mutating it, since
+            # mutation changes its hash
+            if sentence in self.knowledge:
+                self.remove_from_knowledge(sentence)
+                sentence.mark_safes(mask)
+                self.conclude_infer_integrate(sentence)
+
+    def add_knowledge(self, cell, count):
+        """
+        Called when the Minesweeper board tells us, for a given
+        safe cell, how many neighboring cells have mines in them.
+
+        This function should:
+            1) mark the cell as a move that has been made
+            2) mark the cell as safe
+            3) add a new sentence to the AI's knowledge base
+               based on the value of `cell` and `count`
+            4) mark any additional cells as safe or as mines
+               if it can be concluded based on the AI's knowledge base
+            5) add any new sentences to the AI's knowledge base
+               if they can be inferred from existing knowledge
+        """
+        # record as move made
+        self.moves_made.add(cell)
+        self.moves_mask |= self.cell_bit[cell]
+        # record as safe
+        self.mark_safe(cell)
+        # create new knowledge of surrounding cells: unknown neighbors
+        # form the sentence, and known mine neighbors lower its count
+        neighbors = self.neighbor_mask[cell]
+        surrounding_unknowns = neighbors & ~self.safes_mask & ~self.mines_mask
+        count -= (neighbors & self.mines_mask).bit_count()
+        # conclude, infer, integrate new knowledge
+        self.conclude_infer_integrate(
+            Sentence(surrounding_unknowns, count, self.width)
+        )
+
+    # check a sentence for safes or mines, if so, execute conclusions
+    def is_conclusive(self, sentence):
+        # the returned masks are plain ints: immutable snapshots that
+        # need no copying before the batched marks mutate the sentence
+        safes = sentence.known_safes()
+        if safes:
+            self.mark_safes(safes)
+            return True
+        else:
+            mines = sentence.known_mines()
+            if mines:
+                self.mark_mines(mines)
+                return True
+        # if inconclusive, return false
+        return False
+
+    # conclude sentances that are conclusive, draw inferences, add to knowlege
+    def conclude_infer_integrate(self, sentence):
+        # queue the sentence; a drain already running higher up the
+        # stack will pick it up
+        self.work.append(sentence)
+        if self.integrating:
+            return
+        self.integrating = True
+        try:
+            while self.work:
+                sentence = self.work.popleft()
+                # filter empty sentences and sentences that have already been through conclude_infer_integrate
+                if sentence in self.knowledge or sentence.is_empty():
+                    continue
+                # if sentence is conclusive, execute conclusions
+                # (which may queue more work); otherwise...
+                if self.is_conclusive(sentence):
+                    continue
+                # run the inference kernel over the persistently
+                # packed knowledge arrays, deduplicating inferences
+                # with an insertion-ordered dict
+                inferences = {}
+                for cells, count in find_inferences(
+                    sentence.cells, sentence.count, self.kb_cells, self.kb_counts
+                ):
+                    inference = Sentence(cells, count, self.width)
+                    # add inference if it is new
+                    if inference not in inferences and inference not in self.knowledge:
+                        inferences[inference] = None
+                # add sentence to knowledge
+                self.add_to_knowledge(sentence)
+                # queue any inferences made for integration
+                self.work.extend(inferences)
+        finally:
+            self.integrating = False
+
+    def make_safe_move(self):
+        """
+        Returns a safe cell to choose on the Minesweeper board.
+        The move must be known to be safe, and not already a move
+        that has been made.
+        This function may use the knowledge in self.mines, self.safes
+        and self.moves_made, but should not modify any of those values.
+        """
+        for cell in self.safes:
+            if cell not in self.moves_made:
+                return cell
+        return None
+
+    def make_random_move(self):
+        """
+        Returns a move to make on the Minesweeper board.
+        Should choose randomly among cells that:
+            1) have not already been chosen, and
+            2) are not known to be mines
+        """
+        avail = self.all_mask & ~self.mines_mask & ~self.moves_mask
+        if not avail:
+            return None
+        # pick a uniformly random set bit by clearing low set bits
+        for _ in range(random.randrange(avail.bit_count())):
+            avail &= avail - 1
+        bit = avail & -avail
+        return divmod(bit.bit_length() - 1, self.width)